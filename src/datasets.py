@@ -1,20 +1,39 @@
-import secrets
+import os
 import string
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 
 
 _ALPHABET = string.ascii_letters + string.digits
+# Random byte b maps to _ALPHABET[b & 63]; bytes whose low 6 bits are 62 or 63
+# are rejected so each of the 62 characters stays equally likely.
+_TABLE = bytes(ord(_ALPHABET[b & 63]) if (b & 63) < len(_ALPHABET) else 0 for b in range(256))
+_REJECT = bytes(b for b in range(256) if (b & 63) >= len(_ALPHABET))
 
 
 def random_strings(n: int, length: int = 16, prefix: str = "") -> List[str]:
     """Generate n unique-ish random strings (very low collision risk)."""
-    out = []
-    for _ in range(n):
-        token = "".join(secrets.choice(_ALPHABET) for _ in range(length))
-        out.append(f"{prefix}{token}")
-    return out
+    need = n * length
+    buf = bytearray()
+    while len(buf) < need:
+        # ~3% of bytes get rejected; over-read a little so one pass usually suffices
+        missing = need - len(buf)
+        buf += os.urandom(missing + missing // 16 + 16).translate(_TABLE, _REJECT)
+    text = buf[:need].decode("ascii")
+    return [f"{prefix}{text[i * length:(i + 1) * length]}" for i in range(n)]
 
 
-def deterministic_strings(n: int, prefix: str) -> List[str]:
-    """Deterministic dataset useful for debugging/reproducibility."""
-    return [f"{prefix}_{i}" for i in range(n)]
+@lru_cache(maxsize=16)
+def deterministic_strings(n: int, prefix: str) -> Tuple[str, ...]:
+    """Deterministic dataset useful for debugging/reproducibility.
+
+    Cached per (n, prefix); returned as a tuple so callers cannot mutate
+    the shared copy.
+    """
+    return tuple(f"{prefix}_{i}" for i in range(n))
+
+
+@lru_cache(maxsize=16)
+def deterministic_bytes(n: int, prefix: str) -> Tuple[bytes, ...]:
+    """UTF-8 encoded deterministic_strings(n, prefix), cached alongside it."""
+    return tuple(s.encode("utf-8") for s in deterministic_strings(n, prefix))
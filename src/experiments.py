@@ -1,37 +1,38 @@
 import argparse
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import asdict
-from typing import Callable, Dict, List, Tuple
+from typing import Dict, List, Sequence, Tuple
 
 import matplotlib.pyplot as plt
 import pandas as pd
 
 from src.bloom_filter import (
+    BloomFilterBlocked,
     BloomFilterClassic,
     BloomFilterDoubleHash,
+    optimal_params,
     theoretical_fpr,
 )
-from src.datasets import deterministic_strings
+from src.datasets import deterministic_bytes
 
 
-def measure_fpr(bf, inserted: List[str], queries_not_inserted: List[str]) -> float:
-    for x in inserted:
-        bf.add(x)
-    fp = sum(1 for q in queries_not_inserted if q in bf)
+def measure_fpr(bf, queries_not_inserted: Sequence) -> float:
+    # bf must already hold the inserted set (see measure_speed)
+    fp = sum(bf.contains_many(queries_not_inserted))
     return fp / len(queries_not_inserted)
 
 
-def measure_speed(bf_factory: Callable[[], object], inserted: List[str], queries: List[str]) -> Tuple[float, float]:
-    bf = bf_factory()
-
+def measure_speed(bf, inserted: Sequence, queries: Sequence) -> Tuple[float, float]:
+    # Times add_many on the empty, pre-built bf, then contains_many on the
+    # filled one; bf is left filled so measure_fpr can reuse it.
     t0 = time.perf_counter()
-    for x in inserted:
-        bf.add(x)
+    bf.add_many(inserted)
     t1 = time.perf_counter()
 
     t2 = time.perf_counter()
-    _ = sum(1 for q in queries if q in bf)
+    _ = bf.contains_many(queries)
     t3 = time.perf_counter()
 
     return (t1 - t0), (t3 - t2)
@@ -42,108 +43,131 @@ def ensure_results_dir(path: str = "results") -> str:
     return path
 
 
-def run_suite(n_values: List[int], p_target: float, query_multiplier: int = 1) -> pd.DataFrame:
-    rows: List[Dict] = []
+# Column suffix -> filter class, in the order the variants are reported
+VARIANTS = {
+    "classic": BloomFilterClassic,
+    "doublehash": BloomFilterDoubleHash,
+    "blocked": BloomFilterBlocked,
+}
 
-    for n in n_values:
-        inserted = deterministic_strings(n, prefix="IN")
-        queries = deterministic_strings(n * query_multiplier, prefix="OUT")
 
-        # Classic
-        bf_c = BloomFilterClassic(n_expected=n, p_target=p_target)
-        fpr_c = measure_fpr(bf_c, inserted, queries)
-        t_ins_c, t_q_c = measure_speed(lambda: BloomFilterClassic(n_expected=n, p_target=p_target), inserted, queries)
+def _run_cell(n: int, p_target: float, query_multiplier: int, variant: str) -> Dict:
+    """Build, measure and time one filter variant for one n (one result-table cell)."""
+    # Pre-encoded and cached per process, so timings cover only the filter work
+    inserted = deterministic_bytes(n, prefix="IN")
+    queries = deterministic_bytes(n * query_multiplier, prefix="OUT")
+
+    bf = VARIANTS[variant](n_expected=n, p_target=p_target)
+    t_ins, t_q = measure_speed(bf, inserted, queries)
+    fpr = measure_fpr(bf, queries)
+    return {"p_emp": fpr, "insert_time_s": t_ins, "query_time_s": t_q}
 
-        # Double hashing
-        bf_d = BloomFilterDoubleHash(n_expected=n, p_target=p_target)
-        fpr_d = measure_fpr(bf_d, inserted, queries)
-        t_ins_d, t_q_d = measure_speed(lambda: BloomFilterDoubleHash(n_expected=n, p_target=p_target), inserted, queries)
 
-        # Theory (both use same m,k computed from target p)
-        m = bf_c.params.m
-        k = bf_c.params.k
-        p_theory = theoretical_fpr(n=n, m=m, k=k)
+def run_suite(n_values: List[int], p_target: float, query_multiplier: int = 1, jobs: int = 1) -> pd.DataFrame:
+    """Run every (n, variant) cell, in up to `jobs` worker processes.
 
-        rows.append({
+    Cells are independent, so the FPR results do not depend on `jobs`; the
+    timings do, since concurrent cells compete for cores and memory bandwidth.
+    """
+    cells = [(n, variant) for n in n_values for variant in VARIANTS]
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_run_cell, n, p_target, query_multiplier, v) for n, v in cells]
+            results = [f.result() for f in futures]
+    else:
+        results = [_run_cell(n, p_target, query_multiplier, v) for n, v in cells]
+    by_cell = dict(zip(cells, results))
+
+    rows: List[Dict] = []
+    for n in n_values:
+        # Theory (all variants use the same m,k computed from target p)
+        params = optimal_params(n, p_target)
+        row = {
             "n": n,
             "p_target": p_target,
-            "m_bits": m,
-            "k": k,
-            "p_theory": p_theory,
-            "p_emp_classic": fpr_c,
-            "p_emp_doublehash": fpr_d,
-            "insert_time_s_classic": t_ins_c,
-            "query_time_s_classic": t_q_c,
-            "insert_time_s_doublehash": t_ins_d,
-            "query_time_s_doublehash": t_q_d,
-        })
+            "m_bits": params.m,
+            "k": params.k,
+            "p_theory": theoretical_fpr(n=n, m=params.m, k=params.k),
+        }
+        for v in VARIANTS:
+            row[f"p_emp_{v}"] = by_cell[n, v]["p_emp"]
+        for v in VARIANTS:
+            row[f"insert_time_s_{v}"] = by_cell[n, v]["insert_time_s"]
+            row[f"query_time_s_{v}"] = by_cell[n, v]["query_time_s"]
+        rows.append(row)
 
     return pd.DataFrame(rows)
 
 
-def plot_fpr(df: pd.DataFrame, outdir: str) -> None:
-    plt.figure()
-    plt.plot(df["n"], df["p_theory"], marker="o")
-    plt.plot(df["n"], df["p_emp_classic"], marker="o")
-    plt.plot(df["n"], df["p_emp_doublehash"], marker="o")
-    plt.xscale("log")
-    plt.xlabel("n (inserted elements, log scale)")
-    plt.ylabel("False positive rate")
-    plt.title("False positive rate: theory vs empirical")
-    plt.legend(["Theory", "Classic", "Double hashing"])
-    plt.tight_layout()
-    plt.savefig(os.path.join(outdir, "fpr_theory_vs_empirical.png"), dpi=200)
-    plt.close()
-
-
-def plot_speed(df: pd.DataFrame, outdir: str) -> None:
-    plt.figure()
-    plt.plot(df["n"], df["insert_time_s_classic"], marker="o")
-    plt.plot(df["n"], df["insert_time_s_doublehash"], marker="o")
-    plt.xscale("log")
-    plt.xlabel("n (inserted elements, log scale)")
-    plt.ylabel("Insert time (s)")
-    plt.title("Insert time comparison")
-    plt.legend(["Classic", "Double hashing"])
-    plt.tight_layout()
-    plt.savefig(os.path.join(outdir, "insert_time.png"), dpi=200)
-    plt.close()
-
-    plt.figure()
-    plt.plot(df["n"], df["query_time_s_classic"], marker="o")
-    plt.plot(df["n"], df["query_time_s_doublehash"], marker="o")
-    plt.xscale("log")
-    plt.xlabel("n (queries, log scale)")
-    plt.ylabel("Query time (s)")
-    plt.title("Query time comparison")
-    plt.legend(["Classic", "Double hashing"])
-    plt.tight_layout()
-    plt.savefig(os.path.join(outdir, "query_time.png"), dpi=200)
-    plt.close()
+def _save(ax: plt.Axes, path: str) -> None:
+    # bbox_inches="tight" trims the margins at save time instead of running
+    # the tight_layout solver; the axes are then cleared for the next plot
+    ax.figure.savefig(path, dpi=200, bbox_inches="tight")
+    ax.clear()
+
+
+def plot_fpr(df: pd.DataFrame, outdir: str, ax: plt.Axes) -> None:
+    ax.plot(df["n"], df["p_theory"], marker="o")
+    ax.plot(df["n"], df["p_emp_classic"], marker="o")
+    ax.plot(df["n"], df["p_emp_doublehash"], marker="o")
+    ax.plot(df["n"], df["p_emp_blocked"], marker="o")
+    ax.set_xscale("log")
+    ax.set_xlabel("n (inserted elements, log scale)")
+    ax.set_ylabel("False positive rate")
+    ax.set_title("False positive rate: theory vs empirical")
+    ax.legend(["Theory", "Classic", "Double hashing", "Blocked"])
+    _save(ax, os.path.join(outdir, "fpr_theory_vs_empirical.png"))
+
+
+def plot_speed(df: pd.DataFrame, outdir: str, ax: plt.Axes) -> None:
+    ax.plot(df["n"], df["insert_time_s_classic"], marker="o")
+    ax.plot(df["n"], df["insert_time_s_doublehash"], marker="o")
+    ax.plot(df["n"], df["insert_time_s_blocked"], marker="o")
+    ax.set_xscale("log")
+    ax.set_xlabel("n (inserted elements, log scale)")
+    ax.set_ylabel("Insert time (s)")
+    ax.set_title("Insert time comparison")
+    ax.legend(["Classic", "Double hashing", "Blocked"])
+    _save(ax, os.path.join(outdir, "insert_time.png"))
+
+    ax.plot(df["n"], df["query_time_s_classic"], marker="o")
+    ax.plot(df["n"], df["query_time_s_doublehash"], marker="o")
+    ax.plot(df["n"], df["query_time_s_blocked"], marker="o")
+    ax.set_xscale("log")
+    ax.set_xlabel("n (queries, log scale)")
+    ax.set_ylabel("Query time (s)")
+    ax.set_title("Query time comparison")
+    ax.legend(["Classic", "Double hashing", "Blocked"])
+    _save(ax, os.path.join(outdir, "query_time.png"))
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Bloom filter experiments (classic vs double hashing).")
+    parser = argparse.ArgumentParser(description="Bloom filter experiments (classic vs double hashing vs blocked).")
     parser.add_argument("--p", type=float, default=0.01, help="target false positive rate (default: 0.01)")
     parser.add_argument("--n", type=str, default="1000,5000,10000,50000,100000",
                         help="comma-separated n values (default: 1000,5000,10000,50000,100000)")
     parser.add_argument("--qmult", type=int, default=1, help="queries_not_inserted = n * qmult (default: 1)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="worker processes for the (n, variant) cells; >1 skews timings (default: 1)")
     args = parser.parse_args()
 
     n_values = [int(x.strip()) for x in args.n.split(",") if x.strip()]
-    df = run_suite(n_values=n_values, p_target=args.p, query_multiplier=args.qmult)
+    df = run_suite(n_values=n_values, p_target=args.p, query_multiplier=args.qmult, jobs=args.jobs)
 
     outdir = ensure_results_dir("results")
     csv_path = os.path.join(outdir, "results.csv")
     df.to_csv(csv_path, index=False)
 
-    plot_fpr(df, outdir)
-    plot_speed(df, outdir)
+    # One figure shared by all plots; each plot function clears the axes after saving
+    fig, ax = plt.subplots()
+    plot_fpr(df, outdir, ax)
+    plot_speed(df, outdir, ax)
+    plt.close(fig)
 
     # Pretty console summary
-    cols = ["n", "m_bits", "k", "p_theory", "p_emp_classic", "p_emp_doublehash",
-            "insert_time_s_classic", "insert_time_s_doublehash",
-            "query_time_s_classic", "query_time_s_doublehash"]
+    cols = ["n", "m_bits", "k", "p_theory", "p_emp_classic", "p_emp_doublehash", "p_emp_blocked",
+            "insert_time_s_classic", "insert_time_s_doublehash", "insert_time_s_blocked",
+            "query_time_s_classic", "query_time_s_doublehash", "query_time_s_blocked"]
     print(df[cols].to_string(index=False))
     print(f"Saved: {csv_path} and plots in ./{outdir}/")
 